@@ -175,10 +175,22 @@ def create_database(project_dir: Path) -> tuple:
         Tuple of (engine, SessionLocal)
     """
     db_url = get_database_url(project_dir)
-    engine = create_engine(db_url, connect_args={
-        "check_same_thread": False,
-        "timeout": 30  # Wait up to 30s for locks
-    })
+    engine = create_engine(
+        db_url,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": 30  # Wait up to 30s for locks
+        },
+        # Reuse connections across requests instead of reopening the SQLite
+        # handle each time. Note pre-ping cannot detect a deleted database
+        # file: SQLite keeps the unlinked inode alive through open handles,
+        # so callers that cache this engine must dispose it when the
+        # project's files are removed (see server.routers.features).
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+    )
     Base.metadata.create_all(bind=engine)
 
     # Choose journal mode based on filesystem type
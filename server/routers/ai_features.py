@@ -5,26 +5,170 @@ AI Features Router
 Websocket endpoint for the AI Feature Creator chat session.
 """
 
+import asyncio
 import json
 import logging
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import AsyncGenerator, Optional
 
+import msgpack
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+# Do the sys.path dance once at import so the registry import below works
+# when the server package is run from an arbitrary cwd.
+_ROOT = Path(__file__).resolve().parents[2]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from registry import get_project_path as _registry_get_project_path
+
 from ..services.feature_chat_session import get_session, create_session, remove_session
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/projects/{project_name}/ai-features", tags=["ai-features"])
 
-def _get_project_path(project_name: str) -> Path:
-    import sys
-    root = Path(__file__).parent.parent.parent
-    if str(root) not in sys.path:
-        sys.path.insert(0, str(root))
-    from registry import get_project_path
-    return get_project_path(project_name)
+
+async def _send(websocket: WebSocket, obj: dict) -> None:
+    """Send a chunk to the client as a MessagePack binary frame.
+
+    Binary frames skip the UTF-8 validation the browser performs on every
+    text frame, and MessagePack encoding is cheaper than JSON for the
+    small dicts that dominate the token stream. The uplink stays JSON text
+    since the client only sends a few small control messages per session.
+    """
+    await websocket.send_bytes(msgpack.packb(obj, use_bin_type=True))
+
+
+async def _send_text_chunk(websocket: WebSocket, text: str) -> None:
+    """Send a single {"type": "text", "content": ...} streaming chunk."""
+    await _send(websocket, {"type": "text", "content": text})
+
+
+# How long to wait for more text chunks before flushing a batch frame.
+_FLUSH_WINDOW = 0.01
+
+# Force a flush once this much text is pending regardless of timing. A fast
+# stream can keep chunks arriving within _FLUSH_WINDOW of each other
+# indefinitely; without a size trigger nothing would reach the client (or
+# bound memory) until the stream ended.
+_MAX_BATCH_CHARS = 8192
+
+# Sentinel pushed onto the queue when the session stream is exhausted.
+_STREAM_DONE = object()
+
+# Upper bound on chunks buffered between the Claude stream consumer and the
+# WebSocket writer. Keeps a stalled client from buffering a whole response
+# in memory: once full, the pump task blocks on put(), applying
+# backpressure to the upstream receive_response loop.
+_QUEUE_MAXSIZE = 256
+
+
+async def _stream_to_websocket(websocket: WebSocket, stream: AsyncGenerator[dict, None]) -> None:
+    """Relay session chunks to the client, coalescing text tokens.
+
+    Claude yields one chunk per token; sending each as its own WebSocket
+    frame costs a frame header, a syscall, and an event-loop hop. Instead,
+    a pump task feeds chunks into a queue and this coroutine drains it,
+    batching text chunks that arrive within _FLUSH_WINDOW of each other
+    (capped at _MAX_BATCH_CHARS of pending text) into a single
+    {"type": "text_batch", "chunks": [...]} frame. Control messages
+    (feature_created, response_done, error, ...) flush pending text and go
+    out immediately so ordering is preserved.
+
+    The split also decouples upstream reads from downstream writes: the
+    pump keeps draining the Claude stream while the writer is blocked on a
+    slow client, up to the bounded queue size, so a stalled TCP window
+    does not immediately stall the upstream Anthropic connection.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_MAXSIZE)
+
+    async def _pump() -> None:
+        try:
+            async for chunk in stream:
+                await queue.put(chunk)
+        except asyncio.CancelledError:
+            # Cancelled by the consumer's cleanup below. The consumer is no
+            # longer draining the queue, so a blocking sentinel put on a
+            # full queue would absorb the cancellation and hang this task
+            # forever, pinning the session generator and upstream stream.
+            raise
+        except BaseException:
+            await queue.put(_STREAM_DONE)
+            raise
+        else:
+            await queue.put(_STREAM_DONE)
+
+    pending: list[str] = []
+    pending_chars = 0
+
+    async def _flush() -> None:
+        nonlocal pending_chars
+        if len(pending) == 1:
+            await _send_text_chunk(websocket, pending[0])
+        else:
+            await _send(websocket, {"type": "text_batch", "chunks": pending})
+        pending.clear()
+        pending_chars = 0
+
+    pump = asyncio.create_task(_pump())
+    try:
+        done = False
+        while not done:
+            if pending:
+                # Text is buffered; wait briefly for more before flushing.
+                # asyncio.timeout instead of wait_for: wait_for wraps the
+                # get() in an inner future and (on 3.11) swallows external
+                # cancellation when that future has already completed,
+                # making this task uncancellable under fast chunk arrival.
+                try:
+                    async with asyncio.timeout(_FLUSH_WINDOW):
+                        chunk = await queue.get()
+                except TimeoutError:
+                    await _flush()
+                    continue
+            else:
+                chunk = await queue.get()
+
+            # Drain everything already available before touching the socket.
+            while True:
+                if chunk is _STREAM_DONE:
+                    done = True
+                    break
+                if chunk.get("type") == "text":
+                    pending.append(chunk["content"])
+                    pending_chars += len(chunk["content"])
+                    if pending_chars >= _MAX_BATCH_CHARS:
+                        await _flush()
+                else:
+                    if pending:
+                        await _flush()
+                    await _send(websocket, chunk)
+                try:
+                    chunk = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+
+        if pending:
+            await _flush()
+        await pump
+    finally:
+        if not pump.done():
+            pump.cancel()
+
+def _get_project_path(project_name: str) -> Optional[Path]:
+    """Resolve a project name via the registry.
+
+    Deliberately not cached: the registry is the single source of truth,
+    and a name can be re-pointed at a different path at any time (project
+    deleted and re-created, registry.update_project_path) - including from
+    outside this process, where no eviction hook could reach. One SQLite
+    lookup per WebSocket handshake is cheap; the per-connect win of the
+    old approach was the sys.path setup and registry import, which are
+    done once at module load above.
+    """
+    return _registry_get_project_path(project_name)
 
 @router.websocket("/ws")
 async def ai_feature_chat_websocket(websocket: WebSocket, project_name: str):
@@ -33,7 +177,7 @@ async def ai_feature_chat_websocket(websocket: WebSocket, project_name: str):
     Protocol similar to Assistant Chat.
     """
     project_path = _get_project_path(project_name)
-    if not project_path.exists():
+    if not project_path or not project_path.exists():
         await websocket.close(code=4004, reason="Project not found")
         return
 
@@ -43,14 +187,15 @@ async def ai_feature_chat_websocket(websocket: WebSocket, project_name: str):
     session = None
     
     try:
-        while True:
+        # iter_text is Starlette's fast path for text frames and exits
+        # cleanly when the client disconnects.
+        async for data in websocket.iter_text():
             try:
-                data = await websocket.receive_text()
                 message = json.loads(data)
                 msg_type = message.get("type")
                 
                 if msg_type == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    await _send(websocket, {"type": "pong"})
                     continue
 
                 elif msg_type == "start":
@@ -58,46 +203,38 @@ async def ai_feature_chat_websocket(websocket: WebSocket, project_name: str):
                     session = await create_session(project_name, project_path)
                     
                     # Stream initial greeting from session
-                    async for chunk in session.start():
-                        await websocket.send_json(chunk)
+                    await _stream_to_websocket(websocket, session.start())
 
                 elif msg_type == "message":
+                    # Recover the registry session if the local var is unset
+                    session = session or get_session(project_name)
                     if not session:
-                        session = get_session(project_name)
-                        if not session:
-                            # Try to auto-recover session if it exists in memory but local var is None
-                            # (unlikely in this flow but good for safety)
-                            pass
-                            
-                        if not session:
-                             await websocket.send_json({
-                                "type": "error", 
-                                "content": "No active session. Send 'start' first."
-                            })
-                             continue
+                        await _send(websocket, {
+                            "type": "error",
+                            "content": "No active session. Send 'start' first."
+                        })
+                        continue
 
                     user_content = message.get("content", "").strip()
                     if not user_content:
                         continue
 
-                    async for chunk in session.send_message(user_content):
-                        await websocket.send_json(chunk)
+                    await _stream_to_websocket(websocket, session.send_message(user_content))
 
             except json.JSONDecodeError:
-                await websocket.send_json({"type": "error", "content": "Invalid JSON"})
-                
+                await _send(websocket, {"type": "error", "content": "Invalid JSON"})
+
+        # iter_text swallows the receive-side WebSocketDisconnect and exits
+        # the loop cleanly, so normal disconnects land here. The session is
+        # deliberately NOT removed, to allow reconnects; the UI manages the
+        # session lifecycle explicitly.
+        logger.info(f"AI Feature WebSocket disconnected for {project_name}")
     except WebSocketDisconnect:
+        # Disconnect surfaced during a send rather than a receive
         logger.info(f"AI Feature WebSocket disconnected for {project_name}")
-        # Clean up session on disconnect? 
-        # For feature creation, maybe we want to keep it briefly?
-        # But usually if they close the modal, we want to cleanup.
-        # The modal sends specific DELETE if needed, but for WS disconnect
-        # let's play it safe and NOT delete immediately to allow reconnects,
-        # but the UI should handle session lifecycle.
-        pass
     except Exception as e:
         logger.exception(f"WebSocket error for {project_name}")
         try:
-             await websocket.send_json({"type": "error", "content": str(e)})
+             await _send(websocket, {"type": "error", "content": str(e)})
         except:
             pass
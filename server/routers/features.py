@@ -60,15 +60,51 @@ def _get_db_classes():
 router = APIRouter(prefix="/api/projects/{project_name}/features", tags=["features"])
 
 
+# Pooled (engine, sessionmaker) pairs per project directory. A plain dict
+# rather than lru_cache so entries can be evicted when a project is deleted:
+# pooled SQLite connections hold the unlinked inode alive after rmtree, so a
+# recreated project at the same path would otherwise silently read and write
+# the dead database (and never get its schema created) until restart.
+_db_cache: dict[Path, tuple] = {}
+
+
+def _session_factory(project_dir: Path):
+    """Return a cached sessionmaker backed by a pooled engine per project.
+
+    create_database builds the engine and runs schema migrations; doing
+    that once per process (instead of per request) keeps a warm connection
+    pool per project and takes engine setup off the request path.
+    """
+    entry = _db_cache.get(project_dir)
+    if entry is None:
+        create_database, _ = _get_db_classes()
+        entry = create_database(project_dir)
+        _db_cache[project_dir] = entry
+    return entry[1]
+
+
+def dispose_db_for(project_dir: Path) -> None:
+    """Dispose the pooled engine for a project and evict it from the cache.
+
+    Must be called when a project's files are deleted so that a project
+    recreated at the same path gets a fresh engine (and schema) instead of
+    pooled connections pinned to the unlinked database file.
+    """
+    entry = _db_cache.pop(project_dir, None)
+    if entry is not None:
+        try:
+            entry[0].dispose()
+        except Exception:
+            logger.exception("Failed to dispose database engine for %s", project_dir)
+
+
 @contextmanager
 def get_db_session(project_dir: Path):
     """
     Context manager for database sessions.
     Ensures session is always closed, even on exceptions.
     """
-    create_database, _ = _get_db_classes()
-    _, SessionLocal = create_database(project_dir)
-    session = SessionLocal()
+    session = _session_factory(project_dir)()
     try:
         yield session
     finally:
@@ -21,6 +21,7 @@ from ..schemas import (
     ProjectStats,
     ProjectSummary,
 )
+from .features import dispose_db_for
 
 # Lazy imports to avoid circular dependencies
 _imports_initialized = False
@@ -260,6 +261,12 @@ async def delete_project(name: str, delete_files: bool = False):
             detail="Cannot delete project while agent is running. Stop the agent first."
         )
 
+    # Release pooled database connections before touching the files: open
+    # SQLite handles would pin the unlinked database (and block the rmtree
+    # on Windows), and a project recreated at this path must get a fresh
+    # engine rather than connections to the deleted file.
+    dispose_db_for(project_dir)
+
     # Optionally delete files
     if delete_files and project_dir.exists():
         try:
@@ -6,16 +6,28 @@ Manages interactive feature creation conversation with Claude.
 Uses the create-feature.md skill to guide users through adding a new feature.
 """
 
+import asyncio
+import functools
 import json
 import logging
 import os
 import shutil
-import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import AsyncGenerator, Optional
 
-from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+import orjson
+from claude_agent_sdk import (
+    AssistantMessage,
+    ClaudeAgentOptions,
+    ClaudeSDKClient,
+    TextBlock,
+    ToolUseBlock,
+    UserMessage,
+)
+from sqlalchemy import func
+
 from ..schemas import ImageAttachment, FeatureCreate
 
 # Function to create feature in DB
@@ -26,8 +38,58 @@ logger = logging.getLogger(__name__)
 # Root directory of the project
 ROOT_DIR = Path(__file__).parent.parent.parent
 
+# Skill that drives the conversation - immutable at deploy time, so it is
+# read from disk once per process instead of once per session.
+_SKILL_PATH = ROOT_DIR / ".claude" / "commands" / "create-feature.md"
+
+# Security settings written next to each project are static; serialize the
+# JSON once so start() only has to compare/write bytes.
+_SECURITY_SETTINGS = {
+    "sandbox": {"enabled": False},
+    "permissions": {
+        "defaultMode": "acceptEdits",
+        "allow": ["Read(./**)", "Write(./**)", "Edit(./**)", "Glob(./**)"],
+    },
+}
+_SETTINGS_BYTES = json.dumps(_SECURITY_SETTINGS, indent=2).encode()
+
+# Tools whose use can produce the .new_feature.json trigger file.
+_WRITE_TOOLS = frozenset({"Write", "Edit"})
+
+
+@functools.cache
+def _claude_cli_path() -> Optional[str]:
+    """Locate the claude CLI once per process.
+
+    shutil.which walks every PATH entry with a stat per directory; the CLI
+    does not move while the server runs, so there is no reason to repeat
+    the scan on every session start. A pre-warmed pool of SDK clients was
+    considered but does not fit here: each client is bound to a project
+    cwd, settings file, and conversation history, so clients cannot be
+    shared across sessions.
+    """
+    return shutil.which("claude")
+
+
+@functools.cache
+def _load_skill_content() -> Optional[str]:
+    """Read the create-feature skill once, or None if it is missing."""
+    if not _SKILL_PATH.exists():
+        return None
+    try:
+        return _SKILL_PATH.read_text(encoding="utf-8")
+    except UnicodeDecodeError:
+        return _SKILL_PATH.read_text(encoding="utf-8", errors="replace")
+
+@functools.cache
 def get_default_model() -> str:
-    """Get the default model based on environment configuration."""
+    """Get the default model based on environment configuration.
+
+    Cached: the environment is fixed for the lifetime of the process, so
+    the env lookups only need to happen on the first session. Call
+    get_default_model.cache_clear() if the environment ever changes at
+    runtime.
+    """
     if os.getenv("CLAUDE_CODE_USE_BEDROCK") == "1":
         return os.getenv(
             "ANTHROPIC_MODEL",
@@ -53,6 +115,9 @@ class FeatureChatSession:
         self.project_name = project_name
         self.project_dir = project_dir
         self.client: Optional[ClaudeSDKClient] = None
+        # Message history is in-process only; timestamps are stored as raw
+        # time.time() floats (one clock_gettime) and formatted lazily if a
+        # consumer ever needs ISO-8601.
         self.messages: list[dict] = []
         self.complete: bool = False
         self.created_at = datetime.now()
@@ -72,36 +137,24 @@ class FeatureChatSession:
     async def start(self) -> AsyncGenerator[dict, None]:
         """Initialize session and get initial greeting."""
         
-        # Load skill
-        skill_path = ROOT_DIR / ".claude" / "commands" / "create-feature.md"
-        if not skill_path.exists():
+        # Load skill (cached at module level - immutable at deploy time)
+        skill_content = _load_skill_content()
+        if skill_content is None:
             yield {"type": "error", "content": "Skill not found"}
             return
 
-        try:
-            skill_content = skill_path.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
-            skill_content = skill_path.read_text(encoding="utf-8", errors="replace")
-
         # Cleanup potential leftover trigger file
         trigger_file = self.project_dir / ".new_feature.json"
         if trigger_file.exists():
             trigger_file.unlink()
 
-        # Security settings
+        # Security settings - only rewrite if missing or stale
         settings_file = self.project_dir / ".claude_feature_settings.json"
-        security_settings = {
-            "sandbox": {"enabled": False},
-            "permissions": {
-                "defaultMode": "acceptEdits",
-                "allow": ["Read(./**)", "Write(./**)", "Edit(./**)", "Glob(./**)"],
-            },
-        }
-        with open(settings_file, "w") as f:
-            json.dump(security_settings, f, indent=2)
+        if not settings_file.exists() or settings_file.read_bytes() != _SETTINGS_BYTES:
+            settings_file.write_bytes(_SETTINGS_BYTES)
 
         # Create Client
-        system_cli = shutil.which("claude")
+        system_cli = _claude_cli_path()
         try:
             self.client = ClaudeSDKClient(
                 options=ClaudeAgentOptions(
@@ -137,14 +190,14 @@ class FeatureChatSession:
             return
 
         self.messages.append({
-            "role": "user", 
-            "content": user_message, 
+            "role": "user",
+            "content": user_message,
             "has_attachments": bool(attachments),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": time.time(),
         })
 
         try:
-            logger.info(f"Processing user message: {user_message[:50]}...")
+            logger.debug(f"Processing user message: {user_message[:50]}...")
             async for chunk in self._query_claude(user_message, attachments):
                 yield chunk
             logger.info("Finished processing user message")
@@ -166,67 +219,91 @@ class FeatureChatSession:
                     "type": "image",
                     "source": {"type": "base64", "media_type": att.mimeType, "data": att.base64Data}
                 })
-            logger.info("Sent multimodal query to Claude")
+            logger.debug("Sent multimodal query to Claude")
             await self.client.query(_make_multimodal_message(content_blocks))
         else:
-            logger.info(f"Sent text query to Claude: {message[:50]}...")
+            logger.debug(f"Sent text query to Claude: {message[:50]}...")
             await self.client.query(message)
         
-        current_text = ""
         pending_feature_json_write = False
+        # Buffer assistant text and record one history entry per turn in the
+        # finally block below, instead of a dict + clock read per token.
+        asst_parts: list[str] = []
 
         logger.info("Waiting for response stream...")
-        async for msg in self.client.receive_response():
-            msg_type = type(msg).__name__
-            logger.info(f"Received message type: {msg_type}")
-
-            if msg_type == "AssistantMessage":
-                for block in msg.content:
-                    block_type = type(block).__name__
-                    if block_type == "TextBlock":
-                        text = block.text
-                        if text:
-                            current_text += text
-                            yield {"type": "text", "content": text}
-                            self.messages.append({"role": "assistant", "content": text, "timestamp": datetime.now().isoformat()})
-                    
-                    elif block_type == "ToolUseBlock" and block.name in ("Write", "Edit"):
-                        # Check for trigger file
-                        file_path = block.input.get("file_path", "")
-                        if ".new_feature.json" in str(file_path):
-                            pending_feature_json_write = True
-                            logger.info("Agent is writing .new_feature.json")
-
-            elif msg_type == "UserMessage":
-                 # Tool Result
-                 if pending_feature_json_write:
-                     # Check if file exists and valid
-                     trigger_file = self.project_dir / ".new_feature.json"
-                     if trigger_file.exists():
-                         try:
-                             content = json.loads(trigger_file.read_text(encoding="utf-8"))
-                             logger.info(f"Loaded feature definition: {content}")
+        try:
+            async for msg in self.client.receive_response():
+                # Per-message logging is debug-only and guarded: at INFO the
+                # f-string would still be formatted (and the logging lock
+                # taken) for every streamed message.
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Received message type: {type(msg).__name__}")
+
+                if isinstance(msg, AssistantMessage):
+                    for block in msg.content:
+                        if isinstance(block, TextBlock):
+                            text = block.text
+                            if text:
+                                yield {"type": "text", "content": text}
+                                asst_parts.append(text)
+
+                        elif isinstance(block, ToolUseBlock) and block.name in _WRITE_TOOLS:
+                            # Check for trigger file
+                            file_path = str(block.input.get("file_path", ""))
+                            # endswith is a constant-time tail check vs a
+                            # substring scan over the whole path
+                            if file_path.endswith(".new_feature.json"):
+                                pending_feature_json_write = True
+                                logger.info("Agent is writing .new_feature.json")
+
+                elif isinstance(msg, UserMessage):
+                     # Tool Result
+                     if pending_feature_json_write:
+                         # Check if file exists and valid
+                         trigger_file = self.project_dir / ".new_feature.json"
+                         if trigger_file.exists():
+                             try:
+                                 # orjson parses the raw bytes directly - no
+                                 # intermediate str decode and a much faster parser
+                                 content = orjson.loads(trigger_file.read_bytes())
+                                 logger.debug(f"Loaded feature definition: {content}")
                              
-                             # Verify required fields
-                             if "name" in content and "description" in content:
-                                 # CREATE THE FEATURE!
-                                 created_feature = await self._create_feature_in_db(content)
-                                 self.complete = True
-                                 self.created_feature_id = created_feature.id
+                                 # Verify required fields
+                                 if "name" in content and "description" in content:
+                                     # CREATE THE FEATURE!
+                                     created_feature = await self._create_feature_in_db(content)
+                                     self.complete = True
+                                     self.created_feature_id = created_feature.id
                                  
-                                 # Notify client
-                                 yield {"type": "feature_created", "feature": content}
+                                     # Notify client
+                                     yield {"type": "feature_created", "feature": content}
                                  
-                                 # Delete the trigger file
-                                 trigger_file.unlink()
-                                 pending_feature_json_write = False
-                                 return # Stop stream? Or let agent define more? Usually stop.
-                         except Exception as e:
-                             logger.error(f"Failed to process feature json: {e}")
-                             yield {"type": "error", "content": "Failed to create feature from definition."}
-                     pending_feature_json_write = False
+                                     # Delete the trigger file
+                                     trigger_file.unlink()
+                                     pending_feature_json_write = False
+                                     return # Stop stream? Or let agent define more? Usually stop.
+                             except Exception as e:
+                                 logger.error(f"Failed to process feature json: {e}")
+                                 yield {"type": "error", "content": "Failed to create feature from definition."}
+                         pending_feature_json_write = False
+        finally:
+            if asst_parts:
+                self.messages.append({
+                    "role": "assistant",
+                    "content": "".join(asst_parts),
+                    "timestamp": time.time(),
+                })
 
     async def _create_feature_in_db(self, data: dict):
+        """Insert feature into DB without blocking the event loop.
+
+        The SQLAlchemy session API is synchronous; running it inline would
+        stall every other WebSocket connection on this single-loop server
+        for the duration of the DB round-trip.
+        """
+        return await asyncio.to_thread(self._create_feature_in_db_sync, data)
+
+    def _create_feature_in_db_sync(self, data: dict):
         """Insert feature into DB using existing logic reusing schemas."""
         _, Feature = _get_db_classes()
         
@@ -253,8 +330,10 @@ class FeatureChatSession:
         try:
             with get_db_session(self.project_dir) as session:
                 if feature_create.priority is None or isinstance(feature_create.priority, str):
-                    max_priority = session.query(Feature).order_by(Feature.priority.desc()).first()
-                    priority = (max_priority.priority + 1) if max_priority else 1
+                    # MAX() returns a single scalar instead of hydrating a
+                    # full Feature row, and lets SQLite use the priority index
+                    max_priority = session.query(func.max(Feature.priority)).scalar()
+                    priority = (max_priority + 1) if max_priority is not None else 1
                 else:
                     priority = feature_create.priority
 
@@ -275,39 +354,53 @@ class FeatureChatSession:
             raise e
 
 # Session Registry (Singleton style)
+# No lock needed: all callers are coroutines on the single event loop, and
+# the individual dict operations below are atomic under CPython's GIL. The
+# pop-then-set pairs never hit an await point in between, so no other
+# coroutine can interleave. A threading.Lock here would only risk blocking
+# the event loop if it were ever contended.
 _sessions: dict[str, FeatureChatSession] = {}
-_sessions_lock = threading.Lock()
+
+# Keep strong references to background close tasks so they aren't
+# garbage-collected mid-teardown.
+_close_tasks: set[asyncio.Task] = set()
+
+
+async def _safe_close(session: FeatureChatSession) -> None:
+    """Close a session, swallowing and logging any teardown errors."""
+    try:
+        await session.close()
+    except Exception as e:
+        logger.warning(f"Error closing previous feature chat session: {e}")
+
 
 def get_session(project_name: str) -> Optional[FeatureChatSession]:
-    with _sessions_lock:
-        return _sessions.get(project_name)
+    return _sessions.get(project_name)
 
 async def create_session(project_name: str, project_dir: Path) -> FeatureChatSession:
-    old_session = None
-    with _sessions_lock:
-        old_session = _sessions.pop(project_name, None)
-        session = FeatureChatSession(project_name, project_dir)
-        _sessions[project_name] = session
-    
+    old_session = _sessions.pop(project_name, None)
+    session = FeatureChatSession(project_name, project_dir)
+    _sessions[project_name] = session
+
     if old_session:
-        try: await old_session.close()
-        except: pass
-    
+        # Tear down the old Claude subprocess in the background - waiting
+        # for pipes to drain here would delay the client's "start"
+        # round-trip by unrelated cleanup work.
+        task = asyncio.create_task(_safe_close(old_session))
+        _close_tasks.add(task)
+        task.add_done_callback(_close_tasks.discard)
+
     return session
 
 async def remove_session(project_name: str):
-    session = None
-    with _sessions_lock:
-        session = _sessions.pop(project_name, None)
+    session = _sessions.pop(project_name, None)
     if session:
         try: await session.close()
         except: pass
 
 async def cleanup_all_sessions():
-    sessions = []
-    with _sessions_lock:
-        sessions = list(_sessions.values())
-        _sessions.clear()
+    sessions = list(_sessions.values())
+    _sessions.clear()
     for s in sessions:
         try: await s.close()
         except: pass
@@ -3,6 +3,7 @@
  */
 
 import { useState, useCallback, useRef, useEffect } from 'react'
+import { decodeMsgpack } from '../lib/msgpack'
 import type { ChatMessage } from '../lib/types'
 
 type ConnectionStatus = 'disconnected' | 'connecting' | 'connected' | 'error'
@@ -65,6 +66,8 @@ export function useAiFeatureChat({
         const wsUrl = `${protocol}//${host}/api/projects/${encodeURIComponent(projectName)}/ai-features/ws`
 
         const ws = new WebSocket(wsUrl)
+        // Server messages arrive as MessagePack binary frames
+        ws.binaryType = 'arraybuffer'
         wsRef.current = ws
 
         ws.onopen = () => {
@@ -93,10 +96,20 @@ export function useAiFeatureChat({
 
         ws.onmessage = (event) => {
             try {
-                const data = JSON.parse(event.data)
+                // Downlink frames are MessagePack binary; binary frames skip
+                // the browser's per-frame UTF-8 validation of text frames.
+                const data =
+                    event.data instanceof ArrayBuffer
+                        ? (decodeMsgpack(new Uint8Array(event.data)) as any)
+                        : JSON.parse(event.data)
 
                 switch (data.type) {
-                    case 'text': {
+                    case 'text':
+                    case 'text_batch': {
+                        // The server coalesces streamed tokens into batches;
+                        // a batch is equivalent to its chunks joined in order.
+                        const content: string =
+                            data.type === 'text_batch' ? data.chunks.join('') : data.content
                         // Append text to current assistant message or create new one
                         setMessages((prev) => {
                             const lastMessage = prev[prev.length - 1]
@@ -106,7 +119,7 @@ export function useAiFeatureChat({
                                     ...prev.slice(0, -1),
                                     {
                                         ...lastMessage,
-                                        content: lastMessage.content + data.content,
+                                        content: lastMessage.content + content,
                                     },
                                 ]
                             } else {
@@ -117,7 +130,7 @@ export function useAiFeatureChat({
                                     {
                                         id: currentAssistantMessageRef.current,
                                         role: 'assistant',
-                                        content: data.content,
+                                        content,
                                         timestamp: new Date(),
                                         isStreaming: true,
                                     },
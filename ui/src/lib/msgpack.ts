@@ -0,0 +1,151 @@
+/**
+ * Minimal MessagePack decoder for server WebSocket frames.
+ *
+ * Decode-only on purpose: the uplink stays JSON text, and the server only
+ * sends maps of strings, arrays, numbers, booleans and null, so a small
+ * built-in decoder avoids pulling in a full MessagePack dependency.
+ * Spec: https://github.com/msgpack/msgpack/blob/master/spec.md
+ */
+
+const textDecoder = new TextDecoder()
+
+class Reader {
+    private view: DataView
+    private pos = 0
+
+    constructor(private bytes: Uint8Array) {
+        this.view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength)
+    }
+
+    u8(): number {
+        return this.view.getUint8(this.pos++)
+    }
+
+    u16(): number {
+        const v = this.view.getUint16(this.pos)
+        this.pos += 2
+        return v
+    }
+
+    u32(): number {
+        const v = this.view.getUint32(this.pos)
+        this.pos += 4
+        return v
+    }
+
+    i8(): number {
+        return this.view.getInt8(this.pos++)
+    }
+
+    i16(): number {
+        const v = this.view.getInt16(this.pos)
+        this.pos += 2
+        return v
+    }
+
+    i32(): number {
+        const v = this.view.getInt32(this.pos)
+        this.pos += 4
+        return v
+    }
+
+    u64(): number {
+        const v = this.view.getBigUint64(this.pos)
+        this.pos += 8
+        return Number(v)
+    }
+
+    i64(): number {
+        const v = this.view.getBigInt64(this.pos)
+        this.pos += 8
+        return Number(v)
+    }
+
+    f32(): number {
+        const v = this.view.getFloat32(this.pos)
+        this.pos += 4
+        return v
+    }
+
+    f64(): number {
+        const v = this.view.getFloat64(this.pos)
+        this.pos += 8
+        return v
+    }
+
+    str(length: number): string {
+        const v = textDecoder.decode(this.bytes.subarray(this.pos, this.pos + length))
+        this.pos += length
+        return v
+    }
+
+    bin(length: number): Uint8Array {
+        const v = this.bytes.slice(this.pos, this.pos + length)
+        this.pos += length
+        return v
+    }
+
+    value(): unknown {
+        const c = this.u8()
+
+        // Positive fixint
+        if (c <= 0x7f) return c
+        // Fixmap
+        if (c >= 0x80 && c <= 0x8f) return this.map(c & 0x0f)
+        // Fixarray
+        if (c >= 0x90 && c <= 0x9f) return this.array(c & 0x0f)
+        // Fixstr
+        if (c >= 0xa0 && c <= 0xbf) return this.str(c & 0x1f)
+        // Negative fixint
+        if (c >= 0xe0) return c - 0x100
+
+        switch (c) {
+            case 0xc0: return null
+            case 0xc2: return false
+            case 0xc3: return true
+            case 0xc4: return this.bin(this.u8())
+            case 0xc5: return this.bin(this.u16())
+            case 0xc6: return this.bin(this.u32())
+            case 0xca: return this.f32()
+            case 0xcb: return this.f64()
+            case 0xcc: return this.u8()
+            case 0xcd: return this.u16()
+            case 0xce: return this.u32()
+            case 0xcf: return this.u64()
+            case 0xd0: return this.i8()
+            case 0xd1: return this.i16()
+            case 0xd2: return this.i32()
+            case 0xd3: return this.i64()
+            case 0xd9: return this.str(this.u8())
+            case 0xda: return this.str(this.u16())
+            case 0xdb: return this.str(this.u32())
+            case 0xdc: return this.array(this.u16())
+            case 0xdd: return this.array(this.u32())
+            case 0xde: return this.map(this.u16())
+            case 0xdf: return this.map(this.u32())
+            default:
+                throw new Error(`Unsupported MessagePack type: 0x${c.toString(16)}`)
+        }
+    }
+
+    private array(length: number): unknown[] {
+        const result = new Array(length)
+        for (let i = 0; i < length; i++) {
+            result[i] = this.value()
+        }
+        return result
+    }
+
+    private map(length: number): Record<string, unknown> {
+        const result: Record<string, unknown> = {}
+        for (let i = 0; i < length; i++) {
+            const key = this.value()
+            result[String(key)] = this.value()
+        }
+        return result
+    }
+}
+
+export function decodeMsgpack(bytes: Uint8Array): unknown {
+    return new Reader(bytes).value()
+}